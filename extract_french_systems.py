@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import os
+from functools import lru_cache
+from types import MappingProxyType
+
+import fast_json
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 """
 Script pour extraire et organiser les systèmes de terminologie français
@@ -10,6 +23,7 @@ pertinents pour l'adaptation du convertisseur HL7 vers FHIR
 """
 
 # Chemins des fichiers
+CODESYSTEMS_JSONL_FILE = "french_terminology/fhir_codesystems.jsonl"
 CODESYSTEMS_FILE = "french_terminology/fhir_codesystems.json"
 VALUESETS_FILE = "french_terminology/fhir_valuesets.json"
 SYSTEM_URLS_FILE = "french_terminology/system_urls.json"
@@ -33,51 +47,126 @@ IMPORTANT_SYSTEMS = [
     "CPS"
 ]
 
+# Aiguilles en minuscules précalculées : évite de rappeler .lower() sur
+# chaque système important pour chacune des milliers d'entrées du bundle
+_IMPORTANT_LC = [(s, s.lower()) for s in IMPORTANT_SYSTEMS]
+
 def load_json_file(file_path):
     """Charger un fichier JSON"""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(file_path, "rb") as f:
+            return fast_json.loads(f.read())
     except Exception as e:
         print(f"Erreur lors du chargement de {file_path}: {str(e)}")
         return None
 
+def iter_codesystem_resources():
+    """Itérer sur les ressources CodeSystem, au format JSONL de préférence
+
+    Le format JSONL (une ressource par ligne, produit par
+    get_french_terminology.py) se lit en flux sans aucune dépendance ;
+    l'ancien bundle indenté reste supporté via iter_bundle_resources.
+    """
+    if os.path.exists(CODESYSTEMS_JSONL_FILE):
+        with open(CODESYSTEMS_JSONL_FILE, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield fast_json.loads(line)
+        return
+
+    yield from iter_bundle_resources(CODESYSTEMS_FILE)
+
+def iter_bundle_resources(file_path):
+    """Itérer sur les ressources d'un Bundle FHIR sans le charger en entier
+
+    Avec pysimdjson, le bundle est analysé par le parseur SIMD (environ
+    2x plus vite que json sur ce type de contenu riche en URLs) et seules
+    les ressources demandées sont matérialisées en objets Python. À
+    défaut, ijson lit le fichier en flux, une entrée à la fois ; dernier
+    repli : chargement complet via fast_json.
+    """
+    if simdjson is not None:
+        try:
+            doc = simdjson.Parser().load(file_path)
+            for entry in doc.get("entry") or ():
+                resource = entry.get("resource")
+                if resource is not None:
+                    yield resource.as_dict()
+            return
+        except Exception as e:
+            print(f"Erreur lors de la lecture simdjson de {file_path}: {str(e)}")
+            return
+
+    if ijson is not None:
+        try:
+            with open(file_path, "rb") as f:
+                yield from ijson.items(f, "entry.item.resource")
+            return
+        except Exception as e:
+            print(f"Erreur lors de la lecture en flux de {file_path}: {str(e)}")
+            return
+
+    bundle = load_json_file(file_path)
+    if bundle and "entry" in bundle:
+        for entry in bundle["entry"]:
+            yield entry.get("resource", {})
+
+def _file_mtime(file_path):
+    """Date de modification d'un fichier, None s'il est absent"""
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return None
+
 def extract_important_systems():
-    """Extraire les systèmes importants pour la France à partir des CodeSystems"""
+    """Extraire les systèmes importants pour la France à partir des CodeSystems
+
+    Le résultat est mémoïsé sur les dates de modification des fichiers
+    d'entrée : les invocations répétées dans un pipeline ne refont le
+    travail que si les données ont changé.
+    """
+    cache_key = (
+        _file_mtime(SYSTEM_URLS_FILE),
+        _file_mtime(CODESYSTEMS_JSONL_FILE),
+        _file_mtime(CODESYSTEMS_FILE)
+    )
+    return _extract_important_systems_cached(cache_key)
+
+@lru_cache(maxsize=1)
+def _extract_important_systems_cached(cache_key):
     system_urls = load_json_file(SYSTEM_URLS_FILE)
-    codesystems = load_json_file(CODESYSTEMS_FILE)
-    
+
     french_systems = {}
     french_codes = {}
     
     # Extraire les URL des systèmes importants
     if system_urls:
         for name, url in system_urls.items():
-            for important in IMPORTANT_SYSTEMS:
-                if important.lower() in name.lower():
+            name_lc = name.lower()
+            for important, needle in _IMPORTANT_LC:
+                if needle in name_lc:
                     french_systems[important] = {
                         "name": name,
                         "url": url
                     }
     
     # Extraire quelques codes d'exemple pour chaque système
-    if codesystems and "entry" in codesystems:
-        for entry in codesystems["entry"]:
-            resource = entry.get("resource", {})
-            name = resource.get("name", "")
-            url = resource.get("url", "")
-            
-            for important in IMPORTANT_SYSTEMS:
-                if important.lower() in name.lower():
-                    # Chercher quelques concepts/codes d'exemple
-                    concepts = resource.get("concept", [])[:5]  # Limiter à 5 exemples
-                    codes = [{"code": c.get("code"), "display": c.get("display")} for c in concepts if "code" in c]
-                    
-                    if codes:
-                        french_codes[important] = {
-                            "url": url,
-                            "example_codes": codes
-                        }
+    for resource in iter_codesystem_resources():
+        name = resource.get("name", "")
+        url = resource.get("url", "")
+
+        name_lc = name.lower()
+        for important, needle in _IMPORTANT_LC:
+            if needle in name_lc:
+                # Chercher quelques concepts/codes d'exemple
+                concepts = resource.get("concept", [])[:5]  # Limiter à 5 exemples
+                codes = [{"code": c.get("code"), "display": c.get("display")} for c in concepts if "code" in c]
+
+                if codes:
+                    french_codes[important] = {
+                        "url": url,
+                        "example_codes": codes
+                    }
     
     # Combiner les résultats
     result = {
@@ -87,47 +176,51 @@ def extract_important_systems():
     }
     
     # Sauvegarder les résultats
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(fast_json.dumps(result))
     
     print(f"Systèmes français extraits et sauvegardés dans {OUTPUT_FILE}")
     return result
 
-def create_recommended_mappings(french_systems):
-    """Créer des recommandations de mappings pour les problèmes identifiés"""
-    mappings = {
-        "identifier_types": {
-            "INS-C": {
-                "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
-                "code": "PPN",  # Passeport en FHIR R5
-                "display": "Passport Number"
-            },
-            "INS-NIR": {
-                "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
-                "code": "SN",  # Numéro de sécurité sociale en FHIR R5
-                "display": "Subscriber Number"
-            },
-            "Numéro RPPS": {
-                "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
-                "code": "PRN",  # Numéro professionnel en FHIR R5
-                "display": "Provider number"
-            }
+# Partie statique des mappings recommandés : identique à chaque exécution,
+# construite une seule fois à l'import et exposée en lecture seule
+_STATIC_MAPPINGS = MappingProxyType({
+    "identifier_types": {
+        "INS-C": {
+            "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
+            "code": "PPN",  # Passeport en FHIR R5
+            "display": "Passport Number"
         },
-        "encounter_status": {
-            "finished": {
-                "fhir_r5_code": "completed",
-                "display": "Completed"
-            }
+        "INS-NIR": {
+            "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
+            "code": "SN",  # Numéro de sécurité sociale en FHIR R5
+            "display": "Subscriber Number"
         },
-        "practitioner_roles": {
-            "ODRP": {
-                "system": "http://terminology.hl7.org/CodeSystem/v2-0443",
-                "code": "GENPHYS",  # Médecin généraliste
-                "display": "General Practitioner"
-            }
+        "Numéro RPPS": {
+            "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
+            "code": "PRN",  # Numéro professionnel en FHIR R5
+            "display": "Provider number"
+        }
+    },
+    "encounter_status": {
+        "finished": {
+            "fhir_r5_code": "completed",
+            "display": "Completed"
+        }
+    },
+    "practitioner_roles": {
+        "ODRP": {
+            "system": "http://terminology.hl7.org/CodeSystem/v2-0443",
+            "code": "GENPHYS",  # Médecin généraliste
+            "display": "General Practitioner"
         }
     }
-    
+})
+
+def create_recommended_mappings(french_systems):
+    """Créer des recommandations de mappings pour les problèmes identifiés"""
+    mappings = dict(_STATIC_MAPPINGS)
+
     # Ajouter les URL spécifiques pour la France si disponibles
     for system_id, system_data in french_systems.items():
         if system_id == "INS":
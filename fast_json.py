@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+Couche JSON commune pour les scripts de terminologie
+Utilise orjson (sérialisation native, ~5x plus rapide que json) quand il est
+installé, avec repli sur la bibliothèque standard sinon
+Les fichiers doivent être ouverts en mode binaire : loads() accepte des bytes
+et dumps() retourne des bytes indentés sur 2 espaces
+"""
+
+try:
+    import orjson
+
+    loads = orjson.loads
+
+    def dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    def dumps_compact(obj):
+        """Sérialiser un objet en JSON compact, sans indentation"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps_line(obj):
+        """Sérialiser un objet en une ligne JSONL (compacte, '\\n' final)"""
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
+    import json
+
+    loads = json.loads
+
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def dumps_compact(obj):
+        """Sérialiser un objet en JSON compact, sans indentation"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_line(obj):
+        """Sérialiser un objet en une ligne JSONL (compacte, '\\n' final)"""
+        return dumps_compact(obj) + b"\n"
@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import fast_json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 """
 Script pour récupérer les informations sur les terminologies françaises
 depuis le Serveur Multi-Terminologies (SMT) de l'Agence du Numérique en Santé (ANS)
@@ -22,6 +32,15 @@ FHIR_VALUESET_ENDPOINT = f"{BASE_URL}/fhir/ValueSet"
 OUTPUT_DIR = "french_terminology"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Session HTTP partagée : keep-alive vers le SMT (évite une poignée de main
+# TLS par appel) et nouvelles tentatives sur les erreurs passagères
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
 def get_access_token():
     """Obtenir un token d'accès pour les API du SMT"""
     try:
@@ -33,7 +52,7 @@ def get_access_token():
             "client_id": "user-api"
         }
         
-        response = requests.post(SSO_TOKEN_ENDPOINT, headers=headers, data=data)
+        response = SESSION.post(SSO_TOKEN_ENDPOINT, headers=headers, data=data)
         
         if response.status_code == 200:
             token_data = response.json()
@@ -53,13 +72,13 @@ def get_terminology_list(token=None):
         headers["Authorization"] = f"Bearer {token}"
     
     try:
-        response = requests.get(TERMINOLOGY_LIST_ENDPOINT, headers=headers)
+        response = SESSION.get(TERMINOLOGY_LIST_ENDPOINT, headers=headers)
         if response.status_code == 200:
             terminologies = response.json()
             
             # Sauvegarder la liste complète
-            with open(f"{OUTPUT_DIR}/terminologies_list.json", "w", encoding="utf-8") as f:
-                json.dump(terminologies, f, ensure_ascii=False, indent=2)
+            with open(f"{OUTPUT_DIR}/terminologies_list.json", "wb") as f:
+                f.write(fast_json.dumps(terminologies))
                 
             print(f"Liste de {len(terminologies['terminologies'])} terminologies récupérée.")
             return terminologies
@@ -76,17 +95,19 @@ def get_fhir_codesystems(token=None):
     if token:
         headers["Authorization"] = f"Bearer {token}"
     
+    output_path = f"{OUTPUT_DIR}/fhir_codesystems.json"
     try:
-        response = requests.get(FHIR_CODESYSTEM_ENDPOINT, headers=headers)
+        # Écrire la réponse telle quelle sur disque, sans la parser : le
+        # bundle fait des dizaines de Mo et les consommateurs relisent le
+        # fichier en flux (iter_saved_bundle_resources)
+        response = SESSION.get(FHIR_CODESYSTEM_ENDPOINT, headers=headers, stream=True)
         if response.status_code == 200:
-            codesystems = response.json()
-            
-            # Sauvegarder les CodeSystems
-            with open(f"{OUTPUT_DIR}/fhir_codesystems.json", "w", encoding="utf-8") as f:
-                json.dump(codesystems, f, ensure_ascii=False, indent=2)
-                
+            with open(output_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+
             print(f"Liste de CodeSystems FHIR récupérée.")
-            return codesystems
+            return output_path
         else:
             print(f"Erreur lors de la récupération des CodeSystems: {response.status_code} {response.text}")
             return None
@@ -100,17 +121,17 @@ def get_fhir_valuesets(token=None):
     if token:
         headers["Authorization"] = f"Bearer {token}"
     
+    output_path = f"{OUTPUT_DIR}/fhir_valuesets.json"
     try:
-        response = requests.get(FHIR_VALUESET_ENDPOINT, headers=headers)
+        # Même stratégie que pour les CodeSystems : flux direct vers disque
+        response = SESSION.get(FHIR_VALUESET_ENDPOINT, headers=headers, stream=True)
         if response.status_code == 200:
-            valuesets = response.json()
-            
-            # Sauvegarder les ValueSets
-            with open(f"{OUTPUT_DIR}/fhir_valuesets.json", "w", encoding="utf-8") as f:
-                json.dump(valuesets, f, ensure_ascii=False, indent=2)
-                
+            with open(output_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+
             print(f"Liste de ValueSets FHIR récupérée.")
-            return valuesets
+            return output_path
         else:
             print(f"Erreur lors de la récupération des ValueSets: {response.status_code} {response.text}")
             return None
@@ -118,19 +139,41 @@ def get_fhir_valuesets(token=None):
         print(f"Erreur lors de la récupération des ValueSets: {str(e)}")
         return None
 
-def extract_common_system_urls(codesystems, valuesets):
+def iter_saved_bundle_resources(file_path):
+    """Relire en flux les ressources d'un bundle sauvegardé sur disque
+
+    En flux avec ijson quand il est disponible, sinon chargement complet
+    via fast_json.
+    """
+    try:
+        if ijson is not None:
+            with open(file_path, "rb") as f:
+                yield from ijson.items(f, "entry.item.resource")
+            return
+
+        with open(file_path, "rb") as f:
+            bundle = fast_json.loads(f.read())
+        for entry in bundle.get("entry", []):
+            yield entry.get("resource", {})
+    except Exception as e:
+        print(f"Erreur lors de la lecture de {file_path}: {str(e)}")
+
+def count_bundle_entries(file_path):
+    """Compter les entrées d'un bundle sauvegardé"""
+    if not file_path:
+        return 0
+    return sum(1 for _ in iter_saved_bundle_resources(file_path))
+
+def extract_common_system_urls(codesystems_path):
     """Extraire les URLs de systèmes les plus courants pour les mappings"""
     system_urls = {}
-    
-    if codesystems and "entry" in codesystems:
-        for entry in codesystems["entry"]:
-            if "resource" in entry and "url" in entry["resource"]:
-                name = entry["resource"].get("name", "Inconnu")
-                url = entry["resource"]["url"]
-                system_urls[name] = url
-    
-    with open(f"{OUTPUT_DIR}/system_urls.json", "w", encoding="utf-8") as f:
-        json.dump(system_urls, f, ensure_ascii=False, indent=2)
+
+    for resource in iter_saved_bundle_resources(codesystems_path):
+        if "url" in resource:
+            system_urls[resource.get("name", "Inconnu")] = resource["url"]
+
+    with open(f"{OUTPUT_DIR}/system_urls.json", "wb") as f:
+        f.write(fast_json.dumps(system_urls))
     
     return system_urls
 
@@ -140,29 +183,38 @@ def main():
     # Obtenir un token d'accès (peut être None pour les endpoints publics)
     token = get_access_token()
     
-    # Récupérer les données
-    terminologies = get_terminology_list(token)
-    codesystems = get_fhir_codesystems(token)
-    valuesets = get_fhir_valuesets(token)
+    # Récupérer les données : les trois requêtes sont indépendantes, on les
+    # lance en parallèle pour ne payer qu'une fois la latence réseau
+    # (la SESSION partagée gère un pool de connexions thread-safe)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        terminologies_future = executor.submit(get_terminology_list, token)
+        codesystems_future = executor.submit(get_fhir_codesystems, token)
+        valuesets_future = executor.submit(get_fhir_valuesets, token)
+
+        terminologies = terminologies_future.result()
+        codesystems_path = codesystems_future.result()
+        valuesets_path = valuesets_future.result()
     
     # Extraire les URLs de systèmes
-    if codesystems and valuesets:
-        system_urls = extract_common_system_urls(codesystems, valuesets)
+    if codesystems_path and valuesets_path:
+        system_urls = extract_common_system_urls(codesystems_path)
         print(f"{len(system_urls)} URLs de systèmes extraites.")
     
     # Générer un rapport de synthèse
-    generate_summary_report(terminologies, codesystems, valuesets)
+    generate_summary_report(terminologies,
+                            count_bundle_entries(codesystems_path),
+                            count_bundle_entries(valuesets_path))
     
     print(f"Données sauvegardées dans le répertoire '{OUTPUT_DIR}'")
 
-def generate_summary_report(terminologies, codesystems, valuesets):
+def generate_summary_report(terminologies, codesystems_count, valuesets_count):
     """Générer un rapport de synthèse des terminologies françaises"""
     report = {
         "date_generation": datetime.now().isoformat(),
         "statistics": {
             "terminologies_count": len(terminologies["terminologies"]) if terminologies and "terminologies" in terminologies else 0,
-            "codesystems_count": len(codesystems["entry"]) if codesystems and "entry" in codesystems else 0,
-            "valuesets_count": len(valuesets["entry"]) if valuesets and "entry" in valuesets else 0
+            "codesystems_count": codesystems_count,
+            "valuesets_count": valuesets_count
         },
         "key_french_terminologies": []
     }
@@ -181,8 +233,8 @@ def generate_summary_report(terminologies, codesystems, valuesets):
                 "version": term.get("version", "")
             })
     
-    with open(f"{OUTPUT_DIR}/rapport_synthese.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(f"{OUTPUT_DIR}/rapport_synthese.json", "wb") as f:
+        f.write(fast_json.dumps(report))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
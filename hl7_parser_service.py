@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+from collections import namedtuple
+
+import hl7
+
+import fast_json
+
+"""
+Service d'analyse de messages HL7 v2 pour FHIRHub
+Lit un message HL7 (fichier ou entrée standard) et produit une
+représentation JSON structurée (segments, champs, composants)
+exploitable par le convertisseur HL7 vers FHIR
+"""
+
+# Clés de dictionnaire réutilisées pour chaque champ : les littéraux courts
+# sont déjà internés par CPython, les constantes explicitent l'invariant et
+# protègent les chemins construits dynamiquement
+_SEGMENT_ID = sys.intern("segmentId")
+_FIELDS = sys.intern("fields")
+_FIELD_POSITION = sys.intern("fieldPosition")
+_VALUE = sys.intern("value")
+_COMPONENTS = sys.intern("components")
+_COMPONENT_POSITION = sys.intern("componentPosition")
+_SUBCOMPONENTS = sys.intern("subcomponents")
+_REPETITIONS = sys.intern("repetitions")
+
+# Représentation interne compacte : des tuples nommés au lieu de
+# dictionnaires pendant la traversée (un dict par composant coûte ~200 o
+# et une table de hachage chacun), la conversion en dictionnaires n'a
+# lieu qu'au moment de la sérialisation
+Segment = namedtuple("Segment", ["segment_id", "fields"])
+Field = namedtuple("Field", ["position", "value", "repetitions"])
+Component = namedtuple("Component", ["position", "value", "subcomponents"])
+
+def _component_tuple(position, component):
+    """Construire le tuple d'un composant depuis l'objet hl7"""
+    if isinstance(component, str):
+        return Component(position, component, (component,))
+    return Component(position, str(component),
+                     tuple(str(subcomponent) for subcomponent in component))
+
+def _repetition_components(repetition):
+    """Construire la liste des composants d'une répétition"""
+    if isinstance(repetition, str):
+        return (_component_tuple(1, repetition),)
+    return tuple(_component_tuple(j, component) for j, component in enumerate(repetition, start=1))
+
+def _field_tuple(position, value, comp_sep, rep_sep, sub_sep):
+    """Construire le tuple d'un champ depuis sa valeur brute"""
+    if comp_sep not in value and rep_sep not in value and sub_sep not in value:
+        return Field(position, value, ((Component(1, value, (value,)),),))
+    repetitions = tuple(
+        tuple(
+            Component(j, component, tuple(component.split(sub_sep)))
+            for j, component in enumerate(rep.split(comp_sep), start=1)
+        )
+        for rep in value.split(rep_sep)
+    )
+    return Field(position, value, repetitions)
+
+def _fast_parse_segments(hl7_content):
+    """Découper le message en tuples Segment par splits successifs
+
+    hl7.parse() alloue un arbre d'objets pour chaque champ alors que
+    MSH-1/MSH-2 donnent directement les séparateurs : trois niveaux de
+    str.split (en C) suffisent et évitent des dizaines de milliers de
+    petites allocations. Les séquences d'échappement restent brutes,
+    comme avec la bibliothèque ; le mode --strict repasse par hl7.parse
+    pour les cas de conformité pointus.
+    """
+    content = hl7_content.strip()
+    if not content.startswith("MSH") or len(content) < 8:
+        raise ValueError("Message HL7 invalide : segment MSH attendu en tête")
+
+    field_sep = content[3]
+    comp_sep = content[4]
+    rep_sep = content[5]
+    sub_sep = content[7]
+
+    for segment_raw in content.split("\r"):
+        if not segment_raw:
+            continue
+        parts = segment_raw.split(field_sep)
+        segment_id = sys.intern(parts[0])
+        fields = []
+
+        if segment_id == "MSH":
+            # MSH-1 est le séparateur de champ lui-même et MSH-2 les
+            # caractères d'encodage : ni l'un ni l'autre ne se découpe
+            fields.append(Field(1, field_sep, ((Component(1, field_sep, (field_sep,)),),)))
+            if len(parts) > 1:
+                encoding_chars = parts[1]
+                fields.append(Field(2, encoding_chars,
+                                    ((Component(1, encoding_chars, (encoding_chars,)),),)))
+            for i, raw in enumerate(parts[2:], start=3):
+                fields.append(_field_tuple(i, raw, comp_sep, rep_sep, sub_sep))
+        else:
+            for i, raw in enumerate(parts[1:], start=1):
+                fields.append(_field_tuple(i, raw, comp_sep, rep_sep, sub_sep))
+
+        yield Segment(segment_id, tuple(fields))
+
+def iter_segment_tuples(hl7_content, strict=False):
+    """Itérer sur les segments structurés, découpage rapide par défaut"""
+    if strict:
+        for segment in hl7.parse(hl7_content):
+            yield _segment_tuple(segment)
+    else:
+        yield from _fast_parse_segments(hl7_content)
+
+def parse_hl7_message(hl7_content, strict=False):
+    """Analyser un message HL7 et retourner sa structure complète"""
+    segments = list(iter_segment_tuples(hl7_content, strict=strict))
+    segments_by_id = _group_segments(segments)
+    msh_segment = segments_by_id["MSH"][0]
+
+    return {
+        "messageInfo": extract_message_info(msh_segment),
+        "segments": [_segment_to_dict(s) for s in segments],
+        "patientInfo": extract_patient_info(segments_by_id)
+    }
+
+def stream_structured_message(hl7_content, out, strict=False):
+    """Écrire le message structuré en JSON sur 'out' segment par segment
+
+    Contrairement à parse_hl7_message, l'enveloppe JSON est émise au fil
+    de l'itération : un seul segment est matérialisé en dictionnaires à
+    la fois, la mémoire de crête passe du message entier à un segment.
+    Les segments PID rencontrés sont retenus pour produire patientInfo
+    en fin d'enveloppe.
+    """
+    segment_iter = iter_segment_tuples(hl7_content, strict=strict)
+    msh_segment = next(segment_iter)
+    if msh_segment.segment_id != "MSH":
+        raise ValueError("Message HL7 invalide : segment MSH attendu en tête")
+
+    pid_segments = []
+
+    out.write(b'{"messageInfo":')
+    out.write(fast_json.dumps_compact(extract_message_info(msh_segment)))
+    out.write(b',"segments":[')
+    out.write(fast_json.dumps_compact(_segment_to_dict(msh_segment)))
+    for seg in segment_iter:
+        if seg.segment_id == "PID":
+            pid_segments.append(seg)
+        out.write(b",\n")
+        out.write(fast_json.dumps_compact(_segment_to_dict(seg)))
+    out.write(b'],"patientInfo":')
+    out.write(fast_json.dumps_compact(extract_patient_info({"PID": pid_segments})))
+    out.write(b"}\n")
+
+def parse_patient_only(hl7_content, strict=False):
+    """Analyser un message HL7 en ne matérialisant que les données patient
+
+    Chemin rapide pour les appelants qui ne veulent que patientInfo :
+    seuls les segments PID sont structurés, les OBX/NTE et autres segments
+    volumineux ne sont jamais convertis en dictionnaires.
+    """
+    msh_segment = None
+    pid_segments = []
+    for seg in iter_segment_tuples(hl7_content, strict=strict):
+        if msh_segment is None:
+            if seg.segment_id != "MSH":
+                raise ValueError("Message HL7 invalide : segment MSH attendu en tête")
+            msh_segment = seg
+        elif seg.segment_id == "PID":
+            pid_segments.append(seg)
+
+    return {
+        "messageInfo": extract_message_info(msh_segment),
+        "patientInfo": extract_patient_info({"PID": pid_segments})
+    }
+
+def _group_segments(segments):
+    """Indexer les segments par identifiant
+
+    Une seule passe sur le message au lieu d'une recherche linéaire par
+    extracteur : tous les extracteurs (patient, et à terme séjour,
+    couverture...) partagent le même index.
+    """
+    by_id = {}
+    for segment in segments:
+        by_id.setdefault(segment.segment_id, []).append(segment)
+    return by_id
+
+def _segment_tuple(segment):
+    """Construire le tuple d'un segment depuis l'objet hl7"""
+    # Les identifiants de segment (MSH, PID, OBX...) se répètent des milliers
+    # de fois dans un gros message : une seule instance internée suffit
+    segment_id = sys.intern(str(segment[0]))
+    fields = []
+    for i, field in enumerate(segment[1:], start=1):
+        # Cas majoritaire (>70 % du trafic HL7) : champ scalaire sans
+        # répétition ni composant, la bibliothèque le laisse en str ;
+        # on construit le tuple directement sans passer par les helpers
+        if len(field) == 1 and isinstance(field[0], str):
+            value = field[0]
+            fields.append(Field(i, value, ((Component(1, value, (value,)),),)))
+        else:
+            fields.append(Field(i, str(field),
+                                tuple(_repetition_components(rep) for rep in field)))
+    return Segment(segment_id, tuple(fields))
+
+def _component_to_dict(component):
+    return {
+        _COMPONENT_POSITION: component.position,
+        _VALUE: component.value,
+        _SUBCOMPONENTS: [{_VALUE: subcomponent} for subcomponent in component.subcomponents]
+    }
+
+def _segment_to_dict(segment):
+    """Matérialiser un segment interne en dictionnaires sérialisables"""
+    fields = []
+    for field in segment.fields:
+        rep_components = [
+            [_component_to_dict(c) for c in rep] for rep in field.repetitions
+        ]
+        field_data = {
+            _FIELD_POSITION: field.position,
+            _VALUE: field.value,
+            _COMPONENTS: rep_components[0] if rep_components else []
+        }
+        if len(rep_components) > 1:
+            field_data[_REPETITIONS] = rep_components
+        fields.append(field_data)
+
+    return {
+        _SEGMENT_ID: segment.segment_id,
+        _FIELDS: fields
+    }
+
+def extract_message_info(msh_segment):
+    """Extraire les informations d'en-tête du segment MSH"""
+    values_by_pos = {f.position: f.value for f in msh_segment.fields}
+    msh_field = values_by_pos.get
+
+    return {
+        "sendingApplication": msh_field(3, ""),
+        "sendingFacility": msh_field(4, ""),
+        "receivingApplication": msh_field(5, ""),
+        "receivingFacility": msh_field(6, ""),
+        "messageDateTime": msh_field(7, ""),
+        "messageType": msh_field(9, ""),
+        "messageControlId": msh_field(10, ""),
+        "versionId": msh_field(12, "")
+    }
+
+def extract_patient_info(segments_by_id):
+    """Extraire les informations patient du segment PID
+
+    Opère sur l'index segments par identifiant produit par
+    _group_segments, avant toute matérialisation en dictionnaires.
+    """
+    pid_segments = segments_by_id.get("PID")
+    if not pid_segments:
+        return None
+    pid_segment = pid_segments[0]
+
+    # Index des champs par position : chaque accès devient un lookup O(1)
+    # au lieu d'une passe linéaire sur tous les champs du PID
+    fields_by_pos = {f.position: f for f in pid_segment.fields}
+
+    def component_values(field):
+        if not field.repetitions:
+            return {}
+        return {c.position: c.value or None for c in field.repetitions[0]}
+
+    patient_info = {}
+
+    # PID-3 : identifiants du patient (IPP, INS...)
+    patient_id_field = fields_by_pos.get(3)
+    if patient_id_field:
+        identifiers = []
+        for components in patient_id_field.repetitions:
+            comp_by_pos = {c.position: c.value for c in components}
+            identifier = {}
+            if comp_by_pos.get(1):
+                identifier["value"] = comp_by_pos[1]
+                if comp_by_pos.get(4):
+                    identifier["assigningAuthority"] = comp_by_pos[4]
+                if comp_by_pos.get(5):
+                    identifier["type"] = comp_by_pos[5]
+                identifiers.append(identifier)
+        patient_info["identifiers"] = identifiers
+
+    # PID-5 : nom du patient
+    name_field = fields_by_pos.get(5)
+    if name_field:
+        name_components = component_values(name_field)
+        patient_info["name"] = {
+            "family": name_components.get(1),
+            "given": name_components.get(2)
+        }
+
+    # PID-7 : date de naissance
+    birth_field = fields_by_pos.get(7)
+    if birth_field and birth_field.value:
+        patient_info["birthDate"] = birth_field.value
+
+    # PID-8 : sexe
+    gender_field = fields_by_pos.get(8)
+    if gender_field and gender_field.value:
+        patient_info["gender"] = gender_field.value
+
+    # PID-11 : adresse
+    address_field = fields_by_pos.get(11)
+    if address_field:
+        address_components = component_values(address_field)
+        patient_info["address"] = {
+            "line": address_components.get(1),
+            "city": address_components.get(3),
+            "postalCode": address_components.get(5),
+            "country": address_components.get(6)
+        }
+
+    return patient_info
+
+def _write_json(obj):
+    sys.stdout.buffer.write(fast_json.dumps(obj))
+    sys.stdout.buffer.write(b"\n")
+
+def main():
+    args = sys.argv[1:]
+    patient_only = "--patient-only" in args
+    strict = "--strict" in args
+    file_args = [a for a in args if not a.startswith("--")]
+
+    # Lecture binaire puis décodage unique : le mode texte paierait la
+    # traduction universelle des fins de ligne (qui corromprait les CR
+    # séparateurs de segments HL7 sous Windows) plus un décodage par bloc
+    if file_args:
+        with open(file_args[0], "rb") as f:
+            raw = f.read()
+    else:
+        raw = sys.stdin.buffer.read()
+    hl7_content = raw.decode("utf-8", errors="replace")
+
+    # Normaliser les fins de ligne : HL7 utilise CR comme séparateur de segments
+    hl7_content = hl7_content.replace("\r\n", "\r").replace("\n", "\r").strip()
+
+    if not hl7_content:
+        _write_json({"error": "Message HL7 vide"})
+        sys.exit(1)
+
+    try:
+        if patient_only:
+            _write_json(parse_patient_only(hl7_content, strict=strict))
+        else:
+            stream_structured_message(hl7_content, sys.stdout.buffer, strict=strict)
+    except Exception as e:
+        _write_json({"error": f"Erreur lors de l'analyse du message HL7: {str(e)}"})
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()